@@ -1 +1,10 @@
-from .main import app
\ No newline at end of file
+def __getattr__(name):
+    # "app:app" for gunicorn/uvicorn. Resolved lazily so processes that only
+    # need a helper module (the app.passwords hashing pool) do not build the
+    # application and run its schema setup on import.
+    if name == "app":
+        from .main import app
+
+        return app
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,289 @@
+import argparse
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import Column, Date, Integer, MetaData, String, Table, delete, func, select, text
+from sqlalchemy.orm import Session
+
+from app.ai_engine import medical_chatbot_response
+from app.database import IS_SQLITE, SessionLocal, init_schema
+from app.models import ChatHistory, SymptomHistory, SymptomTrend
+from app.retention import iter_archived_chats
+
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert
+else:
+    from sqlalchemy.dialects.postgresql import insert
+
+
+# Terms the chatbot reacts to; chat messages are free text, so only these
+# are rolled up as symptom keywords.
+CHAT_KEYWORDS = [
+    "chest pain", "heart pain", "shortness of breath",
+    "headache", "migraine", "dizziness", "seizure",
+    "skin rash", "itching", "acne", "allergy",
+    "joint pain", "knee pain", "back pain", "fracture",
+    "fever", "cold", "cough", "flu",
+    "diabetes", "high sugar", "blood sugar",
+]
+
+UNSPECIFIED = "unspecified"
+MAX_KEYWORD_LENGTH = 64
+BACKFILL_CHUNK_SIZE = 5000
+
+# backfill() builds the new rollups here, outside the table live requests
+# write to, and only swaps them in at the end
+symptom_trends_staging = Table(
+    "symptom_trends_staging",
+    MetaData(),
+    Column("day", Date, primary_key=True),
+    Column("specialization", String, primary_key=True),
+    Column("keyword", String, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+
+
+def normalize_symptom(symptom: str) -> str:
+    return " ".join(symptom.lower().split())[:MAX_KEYWORD_LENGTH]
+
+
+def chat_keywords(message: str) -> list:
+    message_lower = message.lower()
+    return [word for word in CHAT_KEYWORDS if word in message_lower]
+
+
+def count_prediction(counts: Counter, day: date, specialization: Optional[str], keywords: Iterable[str]):
+    specialization = specialization or UNSPECIFIED
+
+    counts[(day, specialization, "")] += 1
+
+    for keyword in set(keywords):
+        if keyword:
+            counts[(day, specialization, keyword)] += 1
+
+
+def apply_counts(db: Session, counts: Counter, table=SymptomTrend.__table__):
+    if not counts:
+        return
+
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "specialization", "keyword"],
+        set_={"count": table.c["count"] + stmt.excluded["count"]},
+    )
+
+    db.execute(stmt, [
+        {"day": day, "specialization": specialization, "keyword": keyword, "count": n}
+        for (day, specialization, keyword), n in counts.items()
+    ])
+
+
+def record_prediction(
+    db: Session,
+    specialization: Optional[str],
+    keywords: Iterable[str],
+    when: Optional[datetime] = None,
+):
+    # Runs in the caller's transaction so the rollup commits with the history row.
+    counts = Counter()
+    count_prediction(counts, (when or datetime.utcnow()).date(), specialization, keywords)
+    apply_counts(db, counts)
+
+
+def get_trends(
+    db: Session,
+    start: date,
+    end: date,
+    specialization: Optional[str] = None,
+    top: int = 10,
+):
+    in_range = [SymptomTrend.day >= start, SymptomTrend.day <= end]
+    if specialization:
+        in_range.append(SymptomTrend.specialization == specialization.lower())
+
+    daily = db.execute(
+        select(SymptomTrend.day, SymptomTrend.specialization, SymptomTrend.count)
+        .where(SymptomTrend.keyword == "", *in_range)
+        .order_by(SymptomTrend.day, SymptomTrend.specialization)
+    ).all()
+
+    total = func.sum(SymptomTrend.count).label("total")
+    top_symptoms = db.execute(
+        select(SymptomTrend.keyword, total)
+        .where(SymptomTrend.keyword != "", *in_range)
+        .group_by(SymptomTrend.keyword)
+        .order_by(total.desc())
+        .limit(top)
+    ).all()
+
+    return {
+        "start": start,
+        "end": end,
+        "daily": [
+            {"day": row.day, "specialization": row.specialization, "count": row.count}
+            for row in daily
+        ],
+        "top_symptoms": [
+            {"keyword": row.keyword, "count": row.total}
+            for row in top_symptoms
+        ],
+    }
+
+
+def default_range(days: int = 30):
+    end = datetime.utcnow().date()
+    return end - timedelta(days=days - 1), end
+
+
+def _count_symptoms(counts: Counter, rows):
+    for _, created_at, symptoms, specialization in rows:
+        # rows written before created_at existed have no day to file under
+        if created_at is None:
+            continue
+        keywords = [normalize_symptom(s) for s in (symptoms or "").split(",")]
+        count_prediction(counts, created_at.date(), specialization, keywords)
+
+
+def _count_chats(counts: Counter, rows):
+    for _, created_at, message in rows:
+        if created_at is None or not message:
+            continue
+        # chat_history does not store the prediction; the rules are
+        # deterministic, so re-running them recovers it
+        _, specialization = medical_chatbot_response(message)
+        count_prediction(counts, created_at.date(), specialization, chat_keywords(message))
+
+
+SYMPTOM_COLUMNS = (
+    SymptomHistory.id,
+    SymptomHistory.created_at,
+    SymptomHistory.symptoms,
+    SymptomHistory.predicted_specialization,
+)
+CHAT_COLUMNS = (ChatHistory.id, ChatHistory.created_at, ChatHistory.message)
+
+
+def _id_chunks(db: Session, columns, lower_id: int, upper_id: Optional[int], chunk_size: int):
+    # Keyset pagination: every chunk is its own short query, so no cursor
+    # stays open across the commits between chunks.
+    id_column = columns[0]
+
+    while True:
+        query = select(*columns).where(id_column > lower_id).order_by(id_column).limit(chunk_size)
+        if upper_id is not None:
+            query = query.where(id_column <= upper_id)
+
+        rows = db.execute(query).all()
+        if not rows:
+            return
+
+        lower_id = rows[-1][0]
+        yield rows
+
+
+def backfill(db: Session, chunk_size: int = BACKFILL_CHUNK_SIZE):
+    """Rebuilds every rollup from history without blocking live requests.
+
+    History up to the current max ids, including chat messages moved into
+    chat_archive, is aggregated into a staging table,
+    one committed chunk at a time. The final swap is one short transaction
+    that also counts rows written since the scan started.
+    """
+    bind = db.get_bind()
+    symptom_max = db.execute(select(func.max(SymptomHistory.id))).scalar() or 0
+    chat_max = db.execute(select(func.max(ChatHistory.id))).scalar() or 0
+    db.commit()
+
+    symptom_trends_staging.drop(bind, checkfirst=True)
+    symptom_trends_staging.create(bind)
+    processed = 0
+
+    try:
+        for rows in _id_chunks(db, SYMPTOM_COLUMNS, 0, symptom_max, chunk_size):
+            counts = Counter()
+            _count_symptoms(counts, rows)
+            apply_counts(db, counts, symptom_trends_staging)
+            db.commit()
+            processed += len(rows)
+
+        for rows in _id_chunks(db, CHAT_COLUMNS, 0, chat_max, chunk_size):
+            counts = Counter()
+            _count_chats(counts, rows)
+            apply_counts(db, counts, symptom_trends_staging)
+            db.commit()
+            processed += len(rows)
+
+        # chats compacted out of chat_history by app.retention
+        archived = []
+        for entry in iter_archived_chats(db, upper_id=chat_max):
+            archived.append((entry["id"], entry["created_at"], entry["message"]))
+            if len(archived) >= chunk_size:
+                counts = Counter()
+                _count_chats(counts, archived)
+                apply_counts(db, counts, symptom_trends_staging)
+                db.commit()
+                processed += len(archived)
+                archived = []
+
+        counts = Counter()
+        _count_chats(counts, archived)
+        apply_counts(db, counts, symptom_trends_staging)
+        db.commit()
+        processed += len(archived)
+
+        # Swap. Live predictions upsert symptom_trends in the same transaction
+        # as their history row, so once the table is locked every history row
+        # past the scanned ids is either visible here or not committed yet
+        # (and will increment the new rollups after the swap).
+        if not IS_SQLITE:
+            db.execute(text("LOCK TABLE symptom_trends IN EXCLUSIVE MODE"))
+        db.execute(delete(SymptomTrend))
+
+        counts = Counter()
+        for rows in _id_chunks(db, SYMPTOM_COLUMNS, symptom_max, None, chunk_size):
+            _count_symptoms(counts, rows)
+            processed += len(rows)
+        for rows in _id_chunks(db, CHAT_COLUMNS, chat_max, None, chunk_size):
+            _count_chats(counts, rows)
+            processed += len(rows)
+        apply_counts(db, counts, symptom_trends_staging)
+
+        staged = symptom_trends_staging.c
+        db.execute(
+            SymptomTrend.__table__.insert().from_select(
+                ["day", "specialization", "keyword", "count"],
+                select(staged.day, staged.specialization, staged.keyword, staged["count"]),
+            )
+        )
+        db.commit()
+    finally:
+        db.rollback()
+        symptom_trends_staging.drop(bind, checkfirst=True)
+
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Symptom trend rollups")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = subparsers.add_parser(
+        "backfill", help="rebuild rollups from symptom and chat history"
+    )
+    backfill_parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+
+    args = parser.parse_args()
+    init_schema()
+
+    db = SessionLocal()
+    try:
+        processed = backfill(db, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+
+    print(f"Rebuilt symptom trends from {processed} history rows")
+
+
+if __name__ == "__main__":
+    main()
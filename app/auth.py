@@ -2,23 +2,18 @@ from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+import argparse
+import getpass
 import os
 
-from app.database import get_db
+from app.database import SessionLocal, get_db, init_schema
 from app.models import User
+from app.passwords import hash_password, verify_password
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password[:72])
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password[:72], hashed_password)
+# roles anyone can sign up for; admin accounts are only created from the CLI
+PUBLIC_ROLES = ("patient", "doctor")
 
 
 SECRET_KEY = os.getenv("SECRET_KEY", "mysecretkey-change-in-production")
@@ -75,4 +70,43 @@ def require_role(required_role: str):
 
         return user
 
-    return role_checker
\ No newline at end of file
+    return role_checker
+
+
+def create_admin(name: str, email: str, password: str):
+    db = SessionLocal()
+    try:
+        if db.query(User).filter(User.email == email).first():
+            raise ValueError("Email already registered")
+
+        db.add(User(name=name, email=email, password=hash_password(password), role="admin"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Account administration")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    admin_parser = subparsers.add_parser("create-admin", help="create an admin account")
+    admin_parser.add_argument("--name", required=True)
+    admin_parser.add_argument("--email", required=True)
+
+    args = parser.parse_args()
+    init_schema()
+
+    password = getpass.getpass("Password: ")
+    if password != getpass.getpass("Repeat password: "):
+        parser.error("Passwords do not match")
+
+    try:
+        create_admin(args.name, args.email, password)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    print(f"Created admin {args.email}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import csv
+import io
+import json
+import os
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.auth import PUBLIC_ROLES
+from app.database import SessionLocal, init_schema
+from app.models import User
+from app.passwords import configure_pool, hash_passwords
+from app.schemas import UserCreate
+
+
+IMPORT_ROLES = PUBLIC_ROLES
+INSERT_CHUNK_SIZE = 1000
+# keeps IN (...) lists well below the bound-parameter limits of both databases
+EMAIL_LOOKUP_CHUNK_SIZE = 5000
+
+
+def parse_users(data: bytes, filename: str = "") -> list:
+    text = data.decode("utf-8-sig")
+
+    if filename.lower().endswith(".json") or text.lstrip().startswith("["):
+        records = json.loads(text)
+        if not isinstance(records, list):
+            raise ValueError("JSON import must be a list of user objects")
+        return records
+
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _existing_emails(db: Session, emails: list) -> set:
+    existing = set()
+
+    for start in range(0, len(emails), EMAIL_LOOKUP_CHUNK_SIZE):
+        chunk = emails[start:start + EMAIL_LOOKUP_CHUNK_SIZE]
+        existing.update(db.execute(select(User.email).where(User.email.in_(chunk))).scalars())
+
+    return existing
+
+
+def _email_of(record):
+    return record.get("email") if isinstance(record, dict) else None
+
+
+def _validate(records: list, errors: list) -> list:
+    valid = []
+    seen = set()
+
+    for row, record in enumerate(records, start=1):
+        try:
+            # blank CSV cells mean "not given"
+            user = UserCreate(**{k: v for k, v in record.items() if v not in ("", None)})
+        except (ValidationError, TypeError, AttributeError) as exc:
+            errors.append({"row": row, "email": _email_of(record), "error": str(exc)})
+            continue
+
+        if user.role not in IMPORT_ROLES:
+            errors.append({"row": row, "email": user.email, "error": f"Invalid role: {user.role}"})
+        elif user.email in seen:
+            errors.append({"row": row, "email": user.email, "error": "Duplicate email in import"})
+        else:
+            seen.add(user.email)
+            valid.append((row, user))
+
+    return valid
+
+
+def _insert_chunk(db: Session, chunk: list, errors: list) -> int:
+    try:
+        db.execute(insert(User), [values for _, values in chunk])
+        db.commit()
+        return len(chunk)
+    except IntegrityError:
+        # an email was registered while the import ran; retry the chunk row
+        # by row so only the conflicting rows are reported
+        db.rollback()
+
+    created = 0
+    for row, values in chunk:
+        try:
+            db.execute(insert(User), [values])
+            db.commit()
+            created += 1
+        except IntegrityError:
+            db.rollback()
+            errors.append({"row": row, "email": values["email"], "error": "Email already registered"})
+
+    return created
+
+
+def import_users(
+    db: Session,
+    records: list,
+    chunk_size: int = INSERT_CHUNK_SIZE,
+):
+    errors = []
+    valid = _validate(records, errors)
+
+    existing = _existing_emails(db, [user.email for _, user in valid])
+    new_users = []
+    for row, user in valid:
+        if user.email in existing:
+            errors.append({"row": row, "email": user.email, "error": "Email already registered"})
+        else:
+            new_users.append((row, user))
+
+    hashes = hash_passwords([user.password for _, user in new_users])
+
+    rows = [
+        (row, {
+            "name": user.name,
+            "email": user.email,
+            "password": hashed,
+            "role": user.role,
+            "specialization": user.specialization,
+        })
+        for (row, user), hashed in zip(new_users, hashes)
+    ]
+
+    created = 0
+    for start in range(0, len(rows), chunk_size):
+        created += _insert_chunk(db, rows[start:start + chunk_size], errors)
+
+    errors.sort(key=lambda error: error["row"])
+
+    return {"total": len(records), "created": created, "failed": len(errors), "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import doctors and patients")
+    parser.add_argument("path", help="CSV (name,email,password,role,specialization) or JSON list")
+    parser.add_argument("--workers", type=int, default=None, help="hashing processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=INSERT_CHUNK_SIZE)
+    args = parser.parse_args()
+    init_schema()
+
+    # unlike a server worker, the CLI does not share the machine's cores
+    configure_pool(args.workers or os.cpu_count() or 1)
+
+    with open(args.path, "rb") as f:
+        records = parse_users(f.read(), args.path)
+
+    db = SessionLocal()
+    try:
+        report = import_users(db, records, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+
+    for error in report["errors"]:
+        print(f"row {error['row']} ({error['email']}): {error['error']}")
+
+    print(f"Imported {report['created']} of {report['total']} users, {report['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
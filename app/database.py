@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import declarative_base, sessionmaker
 import os
 
@@ -8,9 +8,11 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./healthcare.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
     pool_pre_ping=True,
 )
 
@@ -28,4 +30,44 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def add_missing_schema(bind):
+    # create_all() never alters existing tables, so columns and indexes added
+    # to a model after the table was created are added here (columns are
+    # appended nullable, without a default).
+    inspector = inspect(bind)
+
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                col_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'
+                ))
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+
+
+def init_schema():
+    # Run by the server at import and by each command-line entry point, so a
+    # fresh or upgraded database is ready whichever starts first.
+    from app import models  # noqa: F401 (registers the tables on Base)
+    from app.search import init_search
+
+    Base.metadata.create_all(bind=engine)
+    add_missing_schema(engine)
+    init_search(engine)
@@ -0,0 +1,273 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import Boolean, Date, DateTime, Integer, LargeBinary, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, init_schema
+from app.models import Appointment, ChatHistory, SymptomHistory
+from app.retention import iter_archived_chats
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+
+# table name -> (model, column used for start/end filtering)
+EXPORT_TABLES = {
+    "symptom_history": (SymptomHistory, SymptomHistory.created_at),
+    "chat_history": (ChatHistory, ChatHistory.created_at),
+    "appointments": (Appointment, Appointment.appointment_time),
+}
+
+EXPORT_FORMATS = ("csv", "parquet")
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class ExportState:
+    """Tracks the highest id written, for incremental exports."""
+
+    def __init__(self, after_id: int = 0):
+        self.last_id = after_id
+        self.rows = 0
+
+
+def iter_chunks(
+    db: Session,
+    table: str,
+    state: ExportState,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+):
+    model, time_column = EXPORT_TABLES[table]
+    columns = list(model.__table__.columns)
+    after_id = state.last_id
+
+    if model is ChatHistory:
+        # messages compacted into chat_archive come first; they are older
+        # than anything still in chat_history
+        yield from _archived_chunks(db, columns, state, start, end, chunk_size)
+
+    query = select(*columns).where(model.id > after_id).order_by(model.id)
+    if start:
+        query = query.where(time_column >= start)
+    if end:
+        query = query.where(time_column < end + timedelta(days=1))
+
+    # server-side cursor on PostgreSQL; only one chunk is held in memory
+    result = db.execute(
+        query.execution_options(yield_per=chunk_size, stream_results=True)
+    )
+
+    for chunk in result.partitions():
+        state.last_id = max(state.last_id, chunk[-1].id)
+        state.rows += len(chunk)
+        yield chunk
+
+
+def _archived_chunks(db: Session, columns, state: ExportState, start, end, chunk_size):
+    # Archives are grouped per patient and month, so their ids interleave.
+    # The watermark only moves once the whole archive tier has been sent;
+    # an export cut off before that resumes at the first archive again.
+    chunk = []
+    last_id = state.last_id
+
+    for entry in iter_archived_chats(db, after_id=state.last_id):
+        created_at = entry["created_at"]
+        if start and (created_at is None or created_at.date() < start):
+            continue
+        if end and (created_at is None or created_at.date() > end):
+            continue
+
+        chunk.append(tuple(entry[column.name] for column in columns))
+        last_id = max(last_id, entry["id"])
+
+        if len(chunk) >= chunk_size:
+            state.rows += len(chunk)
+            yield chunk
+            chunk = []
+
+    if chunk:
+        state.rows += len(chunk)
+        yield chunk
+
+    state.last_id = last_id
+
+
+def csv_stream(columns, chunks):
+    yield (",".join(column.name for column in columns) + "\r\n").encode()
+
+    for rows in chunks:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file object that hands back what Parquet wrote so far."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    if isinstance(column.type, LargeBinary):
+        return pa.binary()
+    return pa.string()
+
+
+def parquet_stream(columns, chunks):
+    schema = pa.schema([(column.name, _arrow_type(column)) for column in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    for rows in chunks:
+        # one row group per chunk
+        data = {column.name: [row[i] for row in rows] for i, column in enumerate(columns)}
+        writer.write_table(pa.Table.from_pydict(data, schema=schema))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def export_stream(
+    table: str,
+    export_format: str,
+    state: ExportState,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+):
+    if export_format == "parquet" and pa is None:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    model, _ = EXPORT_TABLES[table]
+    writer = csv_stream if export_format == "csv" else parquet_stream
+
+    def generate():
+        # Owns its session: a streamed response outlives the request's dependencies.
+        db = SessionLocal()
+        try:
+            chunks = iter_chunks(db, table, state, start=start, end=end, chunk_size=chunk_size)
+            yield from writer(list(model.__table__.columns), chunks)
+        finally:
+            db.close()
+
+    return generate()
+
+
+def _load_watermark(path: str, table: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return json.load(f).get(table, 0)
+
+
+def _save_watermark(path: str, table: str, last_id: int):
+    watermarks = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            watermarks = json.load(f)
+
+    watermarks[table] = last_id
+
+    with open(path, "w") as f:
+        json.dump(watermarks, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export history tables for analytics")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--output", help="file to write (default: stdout, csv only)")
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    parser.add_argument("--after-id", type=int, default=None)
+    parser.add_argument(
+        "--state",
+        help="JSON file holding the last exported id per table; read before "
+             "and updated after the export",
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    init_schema()
+
+    if args.format == "parquet" and not args.output:
+        parser.error("--output is required for parquet exports")
+
+    after_id = args.after_id
+    if after_id is None:
+        after_id = _load_watermark(args.state, args.table) if args.state else 0
+
+    state = ExportState(after_id)
+    try:
+        stream = export_stream(
+            args.table,
+            args.format,
+            state,
+            start=args.start,
+            end=args.end,
+            chunk_size=args.chunk_size,
+        )
+    except RuntimeError as exc:
+        parser.error(str(exc))
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for data in stream:
+            out.write(data)
+    finally:
+        if args.output:
+            out.close()
+
+    if args.state:
+        _save_watermark(args.state, args.table, state.last_id)
+
+    print(f"Exported {state.rows} rows from {args.table} (last id {state.last_id})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,16 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
+from datetime import date, datetime
+from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from app.database import engine, get_db
+from app.database import engine, get_db, init_schema
 from app.models import (
-    Base,
     ChatHistory,
     User,
     Appointment,
@@ -31,16 +32,41 @@ from app.auth import (
     create_access_token,
     get_current_user,
     require_role,
+    PUBLIC_ROLES,
 )
 from app.ai_engine import suggest_specialization, medical_chatbot_response
+from app.analytics import (
+    chat_keywords,
+    default_range,
+    get_trends,
+    normalize_symptom,
+    record_prediction,
+)
+from app.search import search_history
+from app.retention import get_chat_history as read_chat_history
+from app.export import EXPORT_FORMATS, EXPORT_TABLES, ExportState, export_stream
+from app.scheduler import SCHEDULER_ENABLED, scheduler
+from app.profiling import PROFILING_ENABLED, install_profiling, load_profile
+from app.bulk_import import import_users, parse_users
+from app.passwords import shutdown_pool
 
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 import os
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    yield
+    if SCHEDULER_ENABLED:
+        scheduler.stop()
+    shutdown_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS
 origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(",")
@@ -52,7 +78,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-Base.metadata.create_all(bind=engine)
+if PROFILING_ENABLED:
+    install_profiling(app, engine)
+
+
+# Under gunicorn (preload_app) this runs once in the master, before workers fork.
+init_schema()
 
 
 @app.get("/")
@@ -63,6 +94,10 @@ def home():
 @app.post("/register")
 def register(user: UserCreate, db: Session = Depends(get_db)):
 
+    # admins are created out-of-band with `python -m app.auth create-admin`
+    if user.role not in PUBLIC_ROLES:
+        raise HTTPException(status_code=400, detail="Invalid role")
+
     existing_user = db.query(User).filter(User.email == user.email).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -164,6 +199,11 @@ def suggest_doctor(
     )
 
     db.add(history)
+    record_prediction(
+        db,
+        specialization,
+        [normalize_symptom(symptom) for symptom in data.symptoms],
+    )
     db.commit()
 
     doctors = db.query(User).filter(
@@ -217,6 +257,32 @@ def get_patient_history_for_doctor(
     return history
 
 
+@app.get("/doctor/search")
+def search_patient_history(
+    q: str,
+    patient_id: Optional[int] = None,
+    page: int = 1,
+    page_size: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("doctor"))
+):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query is required")
+
+    if page < 1 or not 1 <= page_size <= 100:
+        raise HTTPException(status_code=400, detail="Invalid page or page_size")
+
+    results = search_history(
+        db,
+        q,
+        patient_id=patient_id,
+        limit=page_size,
+        offset=(page - 1) * page_size,
+    )
+
+    return {"page": page, "page_size": page_size, "results": results}
+
+
 @app.put("/doctor/diagnose/{history_id}")
 def add_diagnosis(
     history_id: int,
@@ -265,8 +331,9 @@ def get_doctor_availability(
 ):
     slots = db.query(DoctorAvailability).filter(
         DoctorAvailability.doctor_id == doctor_id,
-        DoctorAvailability.is_booked == False
-    ).all()
+        DoctorAvailability.is_booked == False,
+        DoctorAvailability.available_time >= datetime.utcnow()
+    ).order_by(DoctorAvailability.available_time).all()
 
     return [
         {
@@ -380,6 +447,7 @@ def ai_chat(
     )
 
     db.add(chat)
+    record_prediction(db, specialization, chat_keywords(data.message))
     db.commit()
     db.refresh(chat)
 
@@ -407,21 +475,105 @@ def ai_chat(
 
 @app.get("/ai/chat/history")
 def get_chat_history(
+    limit: Optional[int] = None,
+    offset: int = 0,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role("patient"))
 ):
-    chats = db.query(ChatHistory).filter(
-        ChatHistory.patient_id == current_user.id
-    ).all()
+    if (limit is not None and limit < 1) or offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid limit or offset")
 
-    return [
-        {
-            "message": chat.message,
-            "reply": chat.bot_reply,
-            "time": chat.created_at
-        }
-        for chat in chats
-    ]
+    return read_chat_history(db, current_user.id, limit=limit, offset=offset)
+
+
+@app.get("/admin/analytics/trends")
+def get_symptom_trends(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    specialization: Optional[str] = None,
+    top: int = 10,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    default_start, default_end = default_range()
+    start = start or default_start
+    end = end or default_end
+
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+
+    if not 1 <= top <= 100:
+        raise HTTPException(status_code=400, detail="top must be between 1 and 100")
+
+    return get_trends(db, start, end, specialization=specialization, top=top)
+
+
+@app.get("/admin/export/{table}")
+def export_table(
+    table: str,
+    format: str = "csv",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    after_id: int = 0,
+    current_user: User = Depends(require_role("admin"))
+):
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail="Unknown export table")
+
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be csv or parquet")
+
+    try:
+        stream = export_stream(table, format, ExportState(after_id), start=start, end=end)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+
+    media_type = "text/csv" if format == "csv" else "application/vnd.apache.parquet"
+
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
+
+
+@app.get("/admin/scheduler/metrics")
+def get_scheduler_metrics(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    return scheduler.metrics(db)
+
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile_result(
+    profile_id: str,
+    format: str = "json",
+    current_user: User = Depends(require_role("admin"))
+):
+    profile = load_profile(profile_id)
+
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "collapsed":
+        return PlainTextResponse("\n".join(profile["stacks"]) + "\n")
+
+    return profile
+
+
+@app.post("/admin/users/import")
+def bulk_import_users(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    try:
+        records = parse_users(file.file.read(), file.filename or "")
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=400, detail=f"Could not parse import file: {exc}")
+
+    return import_users(db, records)
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
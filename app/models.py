@@ -1,5 +1,18 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column,
+    Integer,
+    Float,
+    String,
+    ForeignKey,
+    DateTime,
+    Date,
+    Text,
+    Boolean,
+    LargeBinary,
+    Index,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
 
 from app.database import Base
@@ -33,6 +46,8 @@ class User(Base):
 
     chats = relationship("ChatHistory", back_populates="patient")
 
+    chat_archives = relationship("ChatArchive", back_populates="patient")
+
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email}, role={self.role})>"
 
@@ -46,6 +61,7 @@ class SymptomHistory(Base):
     predicted_specialization = Column(String)
     diagnosis = Column(Text, nullable=True)
     prescription = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     patient = relationship("User", back_populates="symptom_histories")
 
@@ -55,6 +71,9 @@ class SymptomHistory(Base):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        Index("ix_appointments_status_time", "status", "appointment_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("users.id"))
@@ -81,6 +100,9 @@ class Appointment(Base):
 
 class DoctorAvailability(Base):
     __tablename__ = "doctor_availability"
+    __table_args__ = (
+        Index("ix_doctor_availability_doctor_time", "doctor_id", "available_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     doctor_id = Column(Integer, ForeignKey("users.id"))
@@ -97,7 +119,7 @@ class ChatHistory(Base):
     __tablename__ = "chat_history"
 
     id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(Integer, ForeignKey("users.id"))
+    patient_id = Column(Integer, ForeignKey("users.id"), index=True)
     message = Column(Text)
     bot_reply = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -109,4 +131,63 @@ class ChatHistory(Base):
     )
 
     def __repr__(self):
-        return f"<ChatHistory(id={self.id}, patient_id={self.patient_id})>"
\ No newline at end of file
+        return f"<ChatHistory(id={self.id}, patient_id={self.patient_id})>"
+
+
+class ChatArchive(Base):
+    __tablename__ = "chat_archive"
+    __table_args__ = (
+        UniqueConstraint("patient_id", "month", name="uq_chat_archive_patient_month"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    month = Column(String(7), nullable=False)  # YYYY-MM
+    first_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    message_count = Column(Integer, nullable=False)
+    codec = Column(String, nullable=False)
+    # only loaded when a page of history actually reaches this archive
+    payload = deferred(Column(LargeBinary, nullable=False))
+
+    patient = relationship("User", back_populates="chat_archives")
+
+    def __repr__(self):
+        return f"<ChatArchive(patient_id={self.patient_id}, month={self.month}, messages={self.message_count})>"
+
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+
+    # outcome of the job's runs, shared by every worker
+    runs = Column(Integer, nullable=True)
+    errors = Column(Integer, nullable=True)
+    last_run_at = Column(DateTime, nullable=True)
+    last_duration_ms = Column(Float, nullable=True)
+    last_rows_affected = Column(Integer, nullable=True)
+    total_rows_affected = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"<SchedulerLease(name={self.name}, owner={self.owner}, expires_at={self.expires_at})>"
+
+
+class SymptomTrend(Base):
+    __tablename__ = "symptom_trends"
+    __table_args__ = (
+        UniqueConstraint("day", "specialization", "keyword", name="uq_symptom_trend"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    specialization = Column(String, nullable=False)
+    # "" holds the per-prediction total for the specialization
+    keyword = Column(String, nullable=False, default="")
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SymptomTrend(day={self.day}, specialization={self.specialization}, keyword={self.keyword})>"
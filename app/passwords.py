@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+
+# Only passlib is imported here: hashing pool processes are spawned fresh and
+# import this module, so it must not pull in the app, engine or schema setup.
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Processes in the shared bulk-hashing pool, per server process. Capped
+# because every server worker has its own pool; the CLI raises it.
+HASH_WORKERS = max(1, int(os.getenv("HASH_WORKERS", min(4, os.cpu_count() or 1))))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password[:72])
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password[:72], hashed_password)
+
+
+def _get_pool():
+    # Created on first use and reused by every later import, so concurrent
+    # requests share HASH_WORKERS processes instead of each starting a pool.
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            # spawn avoids forking a server process that already runs other threads
+            _pool = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def configure_pool(workers: int):
+    # Resizes the pool before its next use, e.g. for a one-off
+    # `python -m app.bulk_import` run that has every core to itself.
+    global HASH_WORKERS
+
+    shutdown_pool()
+    HASH_WORKERS = max(1, workers)
+
+
+def hash_passwords(passwords: list) -> list:
+    # bcrypt is CPU-bound, so large batches are spread across processes
+    if HASH_WORKERS <= 1 or len(passwords) < 2:
+        return [hash_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (HASH_WORKERS * 4))
+    return list(_get_pool().map(hash_password, passwords, chunksize=chunksize))
@@ -0,0 +1,267 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+
+import anyio.to_thread
+from jose import JWTError, jwt
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from app.auth import ALGORITHM, SECRET_KEY
+from app.database import SessionLocal
+from app.models import User
+
+
+# The middleware and SQL hooks are only installed when PROFILING_ENABLED=1,
+# so a disabled deployment runs exactly the same code as before.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# oldest profiles are deleted once PROFILE_DIR holds more than this many
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "500"))
+PROFILE_HEADER = b"x-profile"
+
+# frames where a thread is parked rather than doing work
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "thread.py")
+
+_current_profile = ContextVar("current_profile", default=None)
+_run_sync = anyio.to_thread.run_sync
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.status = None
+        self.duration_ms = None
+        self.samples = 0
+        self.stacks = Counter()
+        self.sql = []
+        # ids of the threadpool threads running this request's code right now
+        self.threads = set()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": self.duration_ms,
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "samples": self.samples,
+            "stacks": [f"{stack} {count}" for stack, count in self.stacks.most_common()],
+            "sql": self.sql,
+        }
+
+
+class StackSampler:
+    """Samples the stacks of the request's threads at a fixed interval.
+
+    Sync endpoints, dependencies and streaming bodies run in the threadpool;
+    each worker thread is in profile.threads only while it runs a call for
+    this request, so concurrent requests do not show up. The event loop
+    thread is shared by every request and is not sampled, so async code
+    (routing, the middleware itself) has no stacks; its SQL is still timed.
+    Stacks parked in idle waits are dropped.
+    """
+
+    def __init__(self, profile: RequestProfile):
+        self.profile = profile
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+
+        while not self._stop.wait(interval):
+            frames = sys._current_frames()
+
+            for thread_id in tuple(self.profile.threads):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+
+                stack = _collapse(frame)
+                if stack:
+                    self.profile.stacks[stack] += 1
+            self.profile.samples += 1
+
+
+def _collapse(frame):
+    if os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+        return None
+
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+
+    return ";".join(reversed(names))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        context.profile_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started = getattr(context, "profile_query_start", None)
+    if profile is None or started is None:
+        return
+
+    profile.sql.append({
+        "statement": " ".join(statement.split()),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    })
+
+
+async def _run_sync_profiled(func, *args, **kwargs):
+    # Starlette and FastAPI hand every sync call to the threadpool through
+    # anyio.to_thread.run_sync, so this is where a request's work starts
+    # and ends on a worker thread.
+    profile = _current_profile.get()
+    if profile is None:
+        return await _run_sync(func, *args, **kwargs)
+
+    return await _run_sync(_run_tagged, profile, func, *args, **kwargs)
+
+
+def _run_tagged(profile: RequestProfile, func, *args):
+    thread_id = threading.get_ident()
+    profile.threads.add(thread_id)
+    try:
+        return func(*args)
+    finally:
+        profile.threads.discard(thread_id)
+
+
+def _is_admin(headers) -> bool:
+    authorization = headers.get(b"authorization", b"").decode()
+    if not authorization.lower().startswith("bearer "):
+        return False
+
+    try:
+        payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+
+    # The role claim is only a hint; the stored role decides, so a demoted
+    # account cannot keep profiling until its token expires.
+    if payload.get("role") != "admin" or payload.get("user_id") is None:
+        return False
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == payload["user_id"]).first()
+    finally:
+        db.close()
+
+    return user is not None and user.role == "admin"
+
+
+async def _should_profile(scope) -> bool:
+    headers = dict(scope["headers"])
+
+    if PROFILE_HEADER in headers:
+        # token check and user lookup block, so keep them off the event loop
+        return await run_in_threadpool(_is_admin, headers)
+
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _save(profile: RequestProfile):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile.id}.json"), "w") as f:
+        json.dump(profile.to_dict(), f, indent=2)
+
+    _prune()
+
+
+def _prune():
+    with os.scandir(PROFILE_DIR) as entries:
+        files = [entry for entry in entries if entry.name.endswith(".json") and entry.is_file()]
+
+    if len(files) <= PROFILE_MAX_FILES:
+        return
+
+    files.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in files[:len(files) - PROFILE_MAX_FILES]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            # another worker pruned it first
+            pass
+
+
+def load_profile(profile_id: str):
+    # ids are uuid4 hex; anything else could escape PROFILE_DIR
+    if len(profile_id) != 32 or not all(c in "0123456789abcdef" for c in profile_id):
+        return None
+
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.json")
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+class ProfilingMiddleware:
+    """Profiles requests sent by an admin with an X-Profile header, plus a
+    random PROFILE_SAMPLE_RATE share of all requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not await _should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-profile-id", profile.id.encode())
+                ]
+            await send(message)
+
+        token = _current_profile.set(profile)
+        sampler = StackSampler(profile)
+        started = time.perf_counter()
+        sampler.start()
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            await run_in_threadpool(sampler.stop)
+            profile.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            _current_profile.reset(token)
+            await run_in_threadpool(_save, profile)
+
+
+def install_profiling(app, engine):
+    anyio.to_thread.run_sync = _run_sync_profiled
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    app.add_middleware(ProfilingMiddleware)
@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session, undefer
+
+from app.database import SessionLocal, init_schema
+from app.models import ChatArchive, ChatHistory
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+
+CHAT_RETENTION_DAYS = int(os.getenv("CHAT_RETENTION_DAYS", "90"))
+COMPACTION_BATCH_SIZE = 1000
+ARCHIVE_READ_BATCH_SIZE = 100
+
+
+def compress_entries(entries: list):
+    data = json.dumps(entries, separators=(",", ":")).encode()
+
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress_entries(codec: str, payload: bytes) -> list:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Chat archive is zstd-compressed but zstandard is not installed")
+        data = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        data = zlib.decompress(payload)
+
+    return json.loads(data)
+
+
+def _entry(chat: ChatHistory) -> dict:
+    return {
+        "id": chat.id,
+        "message": chat.message,
+        "reply": chat.bot_reply,
+        "time": chat.created_at.isoformat() if chat.created_at else None,
+    }
+
+
+def _archive_batch(db: Session, chats: list):
+    by_month = defaultdict(list)
+    for chat in chats:
+        by_month[(chat.patient_id, chat.created_at.strftime("%Y-%m"))].append(_entry(chat))
+
+    for (patient_id, month), entries in by_month.items():
+        archive = db.query(ChatArchive).filter(
+            ChatArchive.patient_id == patient_id,
+            ChatArchive.month == month,
+        ).first()
+
+        if archive is None:
+            archive = ChatArchive(patient_id=patient_id, month=month)
+            db.add(archive)
+        else:
+            entries = decompress_entries(archive.codec, archive.payload) + entries
+
+        entries.sort(key=lambda entry: entry["id"])
+
+        archive.codec, archive.payload = compress_entries(entries)
+        archive.first_id = entries[0]["id"]
+        archive.last_id = entries[-1]["id"]
+        archive.message_count = len(entries)
+
+
+def iter_archived_chats(
+    db: Session,
+    after_id: int = 0,
+    upper_id: Optional[int] = None,
+    batch_size: int = ARCHIVE_READ_BATCH_SIZE,
+):
+    """Yields archived messages as ChatHistory-shaped dicts, one archive at a time.
+
+    Only messages with after_id < id <= upper_id are returned; archives are
+    read in batches so their payloads are never all in memory at once.
+    """
+    last_archive_id = 0
+
+    while True:
+        archives = db.query(ChatArchive).options(undefer(ChatArchive.payload)).filter(
+            ChatArchive.id > last_archive_id,
+            ChatArchive.last_id > after_id,
+        ).order_by(ChatArchive.id).limit(batch_size).all()
+
+        if not archives:
+            return
+
+        last_archive_id = archives[-1].id
+
+        for archive in archives:
+            if upper_id is not None and archive.first_id > upper_id:
+                continue
+
+            for entry in decompress_entries(archive.codec, archive.payload):
+                if entry["id"] <= after_id or (upper_id is not None and entry["id"] > upper_id):
+                    continue
+
+                yield {
+                    "id": entry["id"],
+                    "patient_id": archive.patient_id,
+                    "message": entry["message"],
+                    "bot_reply": entry["reply"],
+                    "created_at": datetime.fromisoformat(entry["time"]) if entry["time"] else None,
+                }
+
+
+def compact_chat_history(
+    db: Session,
+    older_than_days: int = CHAT_RETENTION_DAYS,
+    batch_size: int = COMPACTION_BATCH_SIZE,
+    pause: float = 0,
+):
+    # Each batch is its own short transaction, deleting raw rows by primary
+    # key, so live /ai/chat inserts never wait behind the whole compaction.
+    # Archived messages drop out of /doctor/search (see app.search) but are
+    # still read by /ai/chat/history, the trend backfill and the export.
+    # Do not run this while a trend backfill is in progress: rows moving
+    # between tiers mid-scan would be counted twice.
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = 0
+
+    while True:
+        chats = db.execute(
+            select(ChatHistory)
+            .where(ChatHistory.created_at < cutoff)
+            .order_by(ChatHistory.id)
+            .limit(batch_size)
+        ).scalars().all()
+
+        if not chats:
+            break
+
+        _archive_batch(db, chats)
+        db.execute(
+            delete(ChatHistory).where(ChatHistory.id.in_([chat.id for chat in chats]))
+        )
+        db.commit()
+
+        archived += len(chats)
+
+        if pause:
+            time.sleep(pause)
+
+    return archived
+
+
+def get_chat_history(
+    db: Session,
+    patient_id: int,
+    limit: Optional[int] = None,
+    offset: int = 0,
+):
+    """Chat history across the raw and archived tiers, oldest first.
+
+    With a limit, offset counts back from the newest message, so the first
+    page is the most recent conversation. Archives are only decompressed
+    once a page reaches past the raw rows.
+    """
+    if limit is None:
+        entries = []
+        archives = db.query(ChatArchive).filter(
+            ChatArchive.patient_id == patient_id
+        ).order_by(ChatArchive.first_id).all()
+
+        for archive in archives:
+            entries.extend(decompress_entries(archive.codec, archive.payload))
+
+        chats = db.query(ChatHistory).filter(
+            ChatHistory.patient_id == patient_id
+        ).order_by(ChatHistory.id).all()
+
+        return entries + [_entry(chat) for chat in chats]
+
+    chats = db.query(ChatHistory).filter(
+        ChatHistory.patient_id == patient_id
+    ).order_by(ChatHistory.id.desc()).offset(offset).limit(limit).all()
+
+    page = [_entry(chat) for chat in chats]
+    remaining = limit - len(page)
+
+    if remaining > 0:
+        if page:
+            skip = 0
+        else:
+            raw_count = db.query(func.count(ChatHistory.id)).filter(
+                ChatHistory.patient_id == patient_id
+            ).scalar()
+            skip = max(offset - raw_count, 0)
+
+        archives = db.query(ChatArchive).filter(
+            ChatArchive.patient_id == patient_id
+        ).order_by(ChatArchive.first_id.desc())
+
+        # message_count lets whole archives be skipped without decompressing
+        for archive in archives:
+            if skip >= archive.message_count:
+                skip -= archive.message_count
+                continue
+
+            entries = decompress_entries(archive.codec, archive.payload)[::-1]
+            taken = entries[skip:skip + remaining]
+            page.extend(taken)
+            remaining -= len(taken)
+            skip = 0
+
+            if remaining <= 0:
+                break
+
+    return page[::-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat history retention")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = subparsers.add_parser(
+        "compact", help="archive chat messages older than the retention age"
+    )
+    compact_parser.add_argument("--older-than-days", type=int, default=CHAT_RETENTION_DAYS)
+    compact_parser.add_argument("--batch-size", type=int, default=COMPACTION_BATCH_SIZE)
+    compact_parser.add_argument(
+        "--pause", type=float, default=0, help="seconds to sleep between batches"
+    )
+
+    args = parser.parse_args()
+    init_schema()
+
+    db = SessionLocal()
+    try:
+        archived = compact_chat_history(
+            db,
+            older_than_days=args.older_than_days,
+            batch_size=args.batch_size,
+            pause=args.pause,
+        )
+    finally:
+        db.close()
+
+    print(f"Archived {archived} chat messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import heapq
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database import IS_SQLITE, SessionLocal
+from app.models import Appointment, DoctorAvailability, SchedulerLease
+
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert
+else:
+    from sqlalchemy.dialects.postgresql import insert
+
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+SCHEDULER_INTERVAL_SECONDS = int(os.getenv("SCHEDULER_INTERVAL_SECONDS", "300"))
+APPOINTMENT_EXPIRY_HOURS = int(os.getenv("APPOINTMENT_EXPIRY_HOURS", "24"))
+MAINTENANCE_BATCH_SIZE = 1000
+
+
+class LeaseLost(Exception):
+    """Another worker took over the job's lease while it was running."""
+
+
+def _batched(db: Session, statement_for, batch_size: int, renew=None) -> int:
+    # Runs a set-based UPDATE/DELETE over at most batch_size rows per
+    # transaction until a short batch shows nothing is left. renew() extends
+    # the job's lease between batches, so a long run keeps it.
+    total = 0
+
+    while True:
+        result = db.execute(
+            statement_for(batch_size).execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+        total += result.rowcount
+
+        if result.rowcount < batch_size:
+            return total
+
+        if renew is not None:
+            renew()
+
+
+def expire_stale_appointments(
+    db: Session, batch_size: int = MAINTENANCE_BATCH_SIZE, renew=None
+) -> int:
+    """Moves appointments still 'booked' well past their time to 'expired'."""
+    cutoff = datetime.utcnow() - timedelta(hours=APPOINTMENT_EXPIRY_HOURS)
+
+    def statement(limit):
+        stale = select(Appointment.id).where(
+            Appointment.status == "booked",
+            Appointment.appointment_time < cutoff,
+        ).limit(limit)
+        return update(Appointment).where(Appointment.id.in_(stale)).values(status="expired")
+
+    return _batched(db, statement, batch_size, renew)
+
+
+def prune_past_availability(
+    db: Session, batch_size: int = MAINTENANCE_BATCH_SIZE, renew=None
+) -> int:
+    """Deletes unbooked availability slots whose time has passed."""
+    now = datetime.utcnow()
+
+    def statement(limit):
+        past = select(DoctorAvailability.id).where(
+            DoctorAvailability.is_booked == False,
+            DoctorAvailability.available_time < now,
+        ).limit(limit)
+        return delete(DoctorAvailability).where(DoctorAvailability.id.in_(past))
+
+    return _batched(db, statement, batch_size, renew)
+
+
+def acquire_lease(db: Session, name: str, owner: str, ttl: timedelta) -> bool:
+    # The lease row makes a job run on one worker per interval; it is not
+    # released early, so other workers skip the job until it expires.
+    now = datetime.utcnow()
+
+    db.execute(
+        insert(SchedulerLease).values(name=name).on_conflict_do_nothing(index_elements=["name"])
+    )
+
+    result = db.execute(
+        update(SchedulerLease)
+        .where(
+            SchedulerLease.name == name,
+            or_(
+                SchedulerLease.expires_at == None,
+                SchedulerLease.expires_at < now,
+                SchedulerLease.owner == owner,
+            ),
+        )
+        .values(owner=owner, expires_at=now + ttl)
+    )
+    db.commit()
+
+    return result.rowcount == 1
+
+
+def renew_lease(db: Session, name: str, owner: str, ttl: timedelta):
+    result = db.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name, SchedulerLease.owner == owner)
+        .values(expires_at=datetime.utcnow() + ttl)
+    )
+    db.commit()
+
+    if result.rowcount != 1:
+        raise LeaseLost(name)
+
+
+def record_run(db: Session, name: str, duration_ms: float, rows: int = None, error: str = None):
+    # Stored on the lease row rather than in memory, so /admin/scheduler/metrics
+    # shows the last run whichever worker ran it and whichever one answers.
+    values = {
+        "last_run_at": datetime.utcnow(),
+        "last_duration_ms": round(duration_ms, 2),
+    }
+
+    if error is None:
+        values.update(
+            runs=func.coalesce(SchedulerLease.runs, 0) + 1,
+            last_rows_affected=rows,
+            total_rows_affected=func.coalesce(SchedulerLease.total_rows_affected, 0) + rows,
+        )
+    else:
+        values.update(
+            errors=func.coalesce(SchedulerLease.errors, 0) + 1,
+            last_error=error,
+        )
+
+    db.execute(update(SchedulerLease).where(SchedulerLease.name == name).values(**values))
+    db.commit()
+
+
+def _new_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Job:
+    def __init__(self, name: str, func, interval: int):
+        self.name = name
+        self.func = func
+        self.interval = interval
+
+
+class Scheduler:
+    """Runs maintenance jobs from a heap of next-run times on one thread."""
+
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+        self.owner = _new_owner()
+        self._heap = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # With gunicorn's preload_app the scheduler is built once in the
+        # master and inherited by every forked worker; start() runs in each
+        # worker's lifespan, so the lease owner is made unique here.
+        self.owner = _new_owner()
+        now = time.monotonic()
+        for seq, job in enumerate(self.jobs):
+            heapq.heappush(self._heap, (now, seq, job))
+
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def metrics(self, db: Session):
+        leases = {lease.name: lease for lease in db.query(SchedulerLease)}
+        jobs = {}
+
+        for job in self.jobs:
+            # a job that never ran on any worker has no lease row yet
+            lease = leases.get(job.name) or SchedulerLease(name=job.name)
+            jobs[job.name] = {
+                "interval_seconds": job.interval,
+                "owner": lease.owner,
+                "lease_expires_at": lease.expires_at,
+                "runs": lease.runs or 0,
+                "errors": lease.errors or 0,
+                "last_run_at": lease.last_run_at,
+                "last_duration_ms": lease.last_duration_ms,
+                "last_rows_affected": lease.last_rows_affected,
+                "total_rows_affected": lease.total_rows_affected or 0,
+                "last_error": lease.last_error,
+            }
+
+        return {"jobs": jobs}
+
+    def _run(self):
+        while not self._stop.is_set():
+            due, seq, job = self._heap[0]
+            delay = due - time.monotonic()
+
+            if delay > 0:
+                self._stop.wait(delay)
+                continue
+
+            heapq.heapreplace(self._heap, (due + job.interval, seq, job))
+            self.run_job(job)
+
+    def run_job(self, job: Job):
+        db = SessionLocal()
+        ttl = timedelta(seconds=job.interval)
+        started = time.perf_counter()
+
+        try:
+            if not acquire_lease(db, job.name, self.owner, ttl):
+                return
+
+            rows = job.func(db, renew=lambda: renew_lease(db, job.name, self.owner, ttl))
+            duration_ms = (time.perf_counter() - started) * 1000
+
+            record_run(db, job.name, duration_ms, rows=rows)
+
+            if rows:
+                logger.info("%s affected %d rows in %.1f ms", job.name, rows, duration_ms)
+
+        except LeaseLost:
+            # the lease expired mid-run and another worker now owns the job;
+            # it records the outcome
+            db.rollback()
+            logger.warning("Scheduled job %s lost its lease; stopping", job.name)
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Scheduled job %s failed", job.name)
+            try:
+                record_run(db, job.name, (time.perf_counter() - started) * 1000, error=str(exc))
+            except Exception:
+                db.rollback()
+                logger.exception("Could not record failure of %s", job.name)
+        finally:
+            db.close()
+
+
+scheduler = Scheduler([
+    Job("expire_stale_appointments", expire_stale_appointments, SCHEDULER_INTERVAL_SECONDS),
+    Job("prune_past_availability", prune_past_availability, SCHEDULER_INTERVAL_SECONDS),
+])
@@ -0,0 +1,182 @@
+from typing import Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from app.database import IS_SQLITE
+
+
+# Search covers live history only. Chat messages compacted into chat_archive
+# by app.retention (older than CHAT_RETENTION_DAYS) leave the index with
+# their raw rows: the archive is a cold tier and is not searchable.
+#
+# SQLite keeps one FTS5 table for both sources. Its rowid encodes the source
+# row (id * 2 for symptom_history, id * 2 + 1 for chat_history) so triggers
+# can update and delete index entries by rowid instead of scanning.
+# patient_id is indexed too, so per-patient searches intersect posting lists
+# rather than ranking every global hit and filtering afterwards.
+SQLITE_FTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    content,
+    patient_id,
+    tokenize = 'porter unicode61'
+)
+"""
+
+SYMPTOM_CONTENT = "coalesce({row}.symptoms, '') || ' ' || coalesce({row}.diagnosis, '')"
+CHAT_CONTENT = "coalesce({row}.message, '')"
+
+SQLITE_SOURCES = [
+    # (table, rowid, indexed text, columns that trigger a reindex)
+    ("symptom_history", "{row}.id * 2", SYMPTOM_CONTENT, "symptoms, diagnosis, patient_id"),
+    ("chat_history", "{row}.id * 2 + 1", CHAT_CONTENT, "message, patient_id"),
+]
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO history_fts (rowid, content, patient_id)
+        VALUES ({new_rowid}, {new_content}, new.patient_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {columns} ON {table} BEGIN
+        DELETE FROM history_fts WHERE rowid = {old_rowid};
+        INSERT INTO history_fts (rowid, content, patient_id)
+        VALUES ({new_rowid}, {new_content}, new.patient_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+        DELETE FROM history_fts WHERE rowid = {old_rowid};
+    END
+    """,
+]
+
+# PostgreSQL keeps a generated tsvector column per table, so the index can
+# never drift from the row it belongs to.
+POSTGRES_SOURCES = [
+    ("symptom_history", SYMPTOM_CONTENT),
+    ("chat_history", CHAT_CONTENT),
+]
+
+POSTGRES_DDL = """
+ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', {content})) STORED;
+CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)
+"""
+
+
+def init_search(bind):
+    if IS_SQLITE:
+        _init_sqlite(bind)
+    else:
+        _init_postgres(bind)
+
+
+def _init_sqlite(bind):
+    created = not inspect(bind).has_table("history_fts")
+
+    with bind.begin() as conn:
+        conn.execute(text(SQLITE_FTS_TABLE))
+
+        for table, rowid, content, columns in SQLITE_SOURCES:
+            for trigger in SQLITE_TRIGGERS:
+                conn.execute(text(trigger.format(
+                    table=table,
+                    columns=columns,
+                    new_rowid=rowid.format(row="new"),
+                    old_rowid=rowid.format(row="old"),
+                    new_content=content.format(row="new"),
+                )))
+
+            # rows written before the index existed
+            if created:
+                conn.execute(text(
+                    f"INSERT INTO history_fts (rowid, content, patient_id) "
+                    f"SELECT {rowid.format(row=table)}, {content.format(row=table)}, patient_id "
+                    f"FROM {table}"
+                ))
+
+
+def _init_postgres(bind):
+    with bind.begin() as conn:
+        for table, content in POSTGRES_SOURCES:
+            ddl = POSTGRES_DDL.format(table=table, content=content.replace("{row}.", ""))
+            for statement in ddl.split(";"):
+                conn.execute(text(statement))
+
+
+def _fts5_query(query: str, patient_id: Optional[int] = None) -> str:
+    # Quote every term so user input is matched literally (implicit AND).
+    terms = " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+    match = f"content : ({terms})"
+
+    if patient_id is not None:
+        match = f'patient_id : "{int(patient_id)}" AND {match}'
+
+    return match
+
+
+def search_history(
+    db: Session,
+    query: str,
+    patient_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+):
+    params = {"query": query, "patient_id": patient_id, "limit": limit, "offset": offset}
+
+    if IS_SQLITE:
+        params["query"] = _fts5_query(query, patient_id)
+        rows = db.execute(text("""
+            SELECT rowid, patient_id,
+                   -bm25(history_fts) AS score,
+                   snippet(history_fts, 0, '[', ']', '...', 12) AS snippet
+            FROM history_fts
+            WHERE history_fts MATCH :query
+            ORDER BY bm25(history_fts)
+            LIMIT :limit OFFSET :offset
+        """), params).all()
+
+        return [
+            {
+                "source": "chat" if row.rowid % 2 else "symptom",
+                "record_id": row.rowid // 2,
+                "patient_id": row.patient_id,
+                "score": row.score,
+                "snippet": row.snippet,
+            }
+            for row in rows
+        ]
+
+    patient_filter = "AND patient_id = :patient_id" if patient_id is not None else ""
+    hits = " UNION ALL ".join(
+        f"""
+        SELECT '{source}' AS source, id, patient_id, {content.replace("{row}.", "")} AS body,
+               ts_rank(search_vector, q) AS score
+        FROM {table}, plainto_tsquery('english', :query) q
+        WHERE search_vector @@ q {patient_filter}
+        """
+        for source, (table, content) in zip(("symptom", "chat"), POSTGRES_SOURCES)
+    )
+
+    # ts_headline is expensive, so it only runs on the page being returned
+    rows = db.execute(text(f"""
+        SELECT source, id, patient_id, score,
+               ts_headline('english', body, plainto_tsquery('english', :query),
+                           'StartSel=[, StopSel=], MaxWords=24, MinWords=8') AS snippet
+        FROM ({hits} ORDER BY score DESC LIMIT :limit OFFSET :offset) page
+        ORDER BY score DESC
+    """), params).all()
+
+    return [
+        {
+            "source": row.source,
+            "record_id": row.id,
+            "patient_id": row.patient_id,
+            "score": row.score,
+            "snippet": row.snippet,
+        }
+        for row in rows
+    ]
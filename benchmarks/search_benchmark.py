@@ -0,0 +1,133 @@
+"""Compare indexed history search against a LIKE scan.
+
+Usage: python benchmarks/search_benchmark.py [--rows 1000000] [--db PATH]
+       [--database-url postgresql://...]
+
+Builds a throwaway SQLite database (or uses an empty PostgreSQL database
+given with --database-url; DATABASE_URL from the environment is ignored),
+fills symptom_history and chat_history with synthetic rows and times the
+same queries through app.search and through LIKE '%term%'.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = [
+    "fever", "cough", "headache", "migraine", "dizziness", "rash", "itching",
+    "acne", "allergy", "knee", "joint", "back", "pain", "chest", "breathing",
+    "fatigue", "nausea", "vomiting", "sugar", "diabetes", "cold", "flu",
+    "severe", "mild", "since", "yesterday", "week", "night", "morning",
+]
+RARE_WORDS = ["tinnitus", "photophobia", "hemoptysis"]
+
+QUERIES = ["cough", "chest pain", "tinnitus", "severe headache night"]
+
+
+def sentence(rng, length):
+    words = rng.choices(WORDS, k=length)
+    if rng.random() < 0.001:
+        words.append(rng.choice(RARE_WORDS))
+    return " ".join(words)
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--db", default=None, help="SQLite file to build (default: temp file)")
+    parser.add_argument(
+        "--database-url", default=None, help="empty PostgreSQL database to use instead of SQLite"
+    )
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        path = args.db or os.path.join(tempfile.mkdtemp(), "search_bench.db")
+        if os.path.exists(path):
+            sys.exit(f"{path} already exists; pass a new file")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from sqlalchemy import func, insert, select, text
+
+    from app.database import SessionLocal, engine, init_schema
+    from app.models import ChatHistory, SymptomHistory
+    from app.search import search_history
+
+    init_schema()
+
+    with engine.connect() as conn:
+        existing = sum(
+            conn.execute(select(func.count()).select_from(model)).scalar()
+            for model in (SymptomHistory, ChatHistory)
+        )
+    if existing:
+        sys.exit("the benchmark writes synthetic history; use an empty database")
+
+    rng = random.Random(42)
+    half = args.rows // 2
+    batch = 10_000
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, half, batch):
+            n = min(batch, half - offset)
+            conn.execute(insert(SymptomHistory), [
+                {
+                    "patient_id": rng.randint(1, 5000),
+                    "symptoms": sentence(rng, 4),
+                    "predicted_specialization": "general physician",
+                    "diagnosis": sentence(rng, 6),
+                }
+                for _ in range(n)
+            ])
+            conn.execute(insert(ChatHistory), [
+                {
+                    "patient_id": rng.randint(1, 5000),
+                    "message": sentence(rng, 12),
+                    "bot_reply": "ok",
+                }
+                for _ in range(n)
+            ])
+    print(f"inserted {half * 2} rows (index maintained on insert) in {time.perf_counter() - start:.1f}s")
+
+    db = SessionLocal()
+    try:
+        print(f"{'query':<24}{'scope':<10}{'LIKE ms':>10}{'index ms':>10}{'hits':>6}")
+        for query in QUERIES:
+            term = f"%{query}%"
+            for scope, patient_id in (("global", None), ("patient", 42)):
+                # the naive endpoint: every match has to be found before any
+                # ranking or pagination can happen
+                patient_filter = "AND patient_id = :p" if patient_id else ""
+                like = text(
+                    f"SELECT id FROM symptom_history WHERE (symptoms LIKE :t OR diagnosis LIKE :t) "
+                    f"{patient_filter} UNION ALL "
+                    f"SELECT id FROM chat_history WHERE message LIKE :t {patient_filter}"
+                )
+                like_ms, _ = timed(
+                    lambda: db.execute(like, {"t": term, "p": patient_id}).all(), repeat=3
+                )
+                index_ms, hits = timed(
+                    lambda: search_history(db, query, patient_id=patient_id, limit=20)
+                )
+                print(f"{query:<24}{scope:<10}{like_ms:>10.1f}{index_ms:>10.1f}{len(hits):>6}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Compare request throughput of the single-process and multi-worker servers.
+
+Usage: python benchmarks/throughput_benchmark.py [--mode both|single|multi]
+       [--endpoint login|doctors] [--concurrency 16] [--duration 15]
+
+Starts the app on a throwaway SQLite database, once with the single
+'uvicorn app:app' process and once with gunicorn.conf.py, and drives it
+with concurrent keep-alive clients for a fixed duration.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "single": ["uvicorn", "app:app", "--host", "127.0.0.1", "--port", "{port}", "--log-level", "warning"],
+    "multi": ["gunicorn", "app:app", "-c", "gunicorn.conf.py", "--bind", "127.0.0.1:{port}",
+              "--access-logfile", "/dev/null"],
+}
+
+USER = {"name": "Bench", "email": "bench@example.com", "password": "bench-password"}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(conn, method, path, body=None):
+    payload = json.dumps(body) if body is not None else None
+    conn.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = response.read()
+    return response.status, data
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            request(conn, "GET", "/doctors")
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def run_load(port, endpoint, concurrency, duration):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        nonlocal errors
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = []
+        failed = 0
+
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                if endpoint == "login":
+                    status, _ = request(conn, "POST", "/login", {"email": USER["email"], "password": USER["password"]})
+                else:
+                    status, _ = request(conn, "GET", "/doctors")
+            except (OSError, http.client.HTTPException):
+                # a recycled worker (max_requests) closes its keep-alive
+                # connections; count the failure and reconnect
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                status = None
+            local.append(time.perf_counter() - started)
+            failed += status != 200
+
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / duration,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+    }
+
+
+def bench(mode, args):
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'throughput.db')}",
+        SCHEDULER_ENABLED="0",
+    )
+    if args.workers:
+        env["WEB_CONCURRENCY"] = str(args.workers)
+
+    command = [part.format(port=port) for part in SERVERS[mode]]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stderr=subprocess.DEVNULL)
+
+    try:
+        wait_until_up(port)
+        request(http.client.HTTPConnection("127.0.0.1", port), "POST", "/register", USER)
+        run_load(port, args.endpoint, args.concurrency, 2)  # warm-up
+        return run_load(port, args.endpoint, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("both", "single", "multi"), default="both")
+    parser.add_argument("--endpoint", choices=("login", "doctors"), default="login")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--workers", type=int, default=None, help="WEB_CONCURRENCY for gunicorn")
+    args = parser.parse_args()
+
+    modes = ("single", "multi") if args.mode == "both" else (args.mode,)
+
+    print(f"endpoint={args.endpoint} concurrency={args.concurrency} cores={os.cpu_count()}")
+    print(f"{'server':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for mode in modes:
+        result = bench(mode, args)
+        print(f"{mode:<8}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+              f"{result['p95_ms']:>10.1f}{result['errors']:>8}")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# Production server profile: gunicorn app:app -c gunicorn.conf.py
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# bcrypt and the chat endpoints are CPU-bound: one worker per core. More
+# workers than cores only adds context switches (see DEPLOYMENT.md).
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Import the app (and run init_schema) once in the master; workers fork
+# from the already-initialised process.
+preload_app = True
+
+# Recycle each worker after a bounded number of requests to cap memory
+# growth; jitter keeps workers from restarting at the same moment.
+max_requests = int(os.getenv("MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "100"))
+
+# On SIGTERM workers stop accepting connections and get this long to finish
+# in-flight requests (and run lifespan shutdown) before being killed.
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+accesslog = "-"
+
+
+def when_ready(server):
+    # The master used a connection for the schema checks; it serves no
+    # requests, so it should not keep it open.
+    from app.database import engine
+
+    engine.dispose()
+
+
+def post_fork(server, worker):
+    # Pooled connections must not be shared across processes: drop the
+    # inherited pool without closing the parent's sockets, so each worker
+    # opens its own connections.
+    from app.database import engine
+
+    engine.dispose(close=False)
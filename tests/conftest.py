@@ -0,0 +1,53 @@
+import os
+import tempfile
+import uuid
+
+# must be configured before the app (and its engine) is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ["SCHEDULER_ENABLED"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token, hash_password
+from app.database import SessionLocal
+from app.main import app
+from app.models import User
+
+
+PASSWORD = "password"
+PASSWORD_HASH = hash_password(PASSWORD)
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    def factory(role="patient", specialization=None):
+        user = User(
+            name=role.title(),
+            email=f"{role}-{uuid.uuid4().hex[:8]}@example.com",
+            password=PASSWORD_HASH,
+            role=role,
+            specialization=specialization,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+
+        token = create_access_token({"user_id": user.id, "role": user.role})
+        return user, {"Authorization": f"Bearer {token}"}
+
+    return factory
@@ -0,0 +1,40 @@
+def test_trends_rejects_out_of_range_top(client, make_user):
+    _, admin = make_user("admin")
+
+    for top in (-1, 0, 101):
+        response = client.get("/admin/analytics/trends", params={"top": top}, headers=admin)
+        assert response.status_code == 400
+
+    assert client.get("/admin/analytics/trends", params={"top": 5}, headers=admin).status_code == 200
+
+
+def test_predictions_update_rollups(client, make_user):
+    _, patient = make_user("patient")
+    _, admin = make_user("admin")
+
+    client.post("/ai/suggest-doctor", json={"symptoms": ["Itching", "rash"]}, headers=patient)
+
+    trends = client.get(
+        "/admin/analytics/trends", params={"specialization": "dermatologist"}, headers=admin
+    ).json()
+
+    assert sum(day["count"] for day in trends["daily"]) >= 1
+    assert {"itching", "rash"} <= {symptom["keyword"] for symptom in trends["top_symptoms"]}
+
+
+def test_backfill_rebuilds_rollups(client, db, make_user):
+    from app.analytics import backfill
+    from app.models import SymptomTrend
+
+    _, patient = make_user("patient")
+    client.post("/ai/suggest-doctor", json={"symptoms": ["knee pain"]}, headers=patient)
+    client.post("/ai/chat", json={"message": "my knee pain is worse"}, headers=patient)
+
+    before = {(t.day, t.specialization, t.keyword): t.count for t in db.query(SymptomTrend)}
+    db.query(SymptomTrend).delete()
+    db.commit()
+
+    backfill(db, chunk_size=2)
+
+    after = {(t.day, t.specialization, t.keyword): t.count for t in db.query(SymptomTrend)}
+    assert after == before
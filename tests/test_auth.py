@@ -0,0 +1,32 @@
+def test_register_rejects_admin_role(client):
+    response = client.post("/register", json={
+        "name": "Mallory",
+        "email": "mallory@example.com",
+        "password": "secret",
+        "role": "admin",
+    })
+
+    assert response.status_code == 400
+    assert client.post("/login", json={
+        "email": "mallory@example.com",
+        "password": "secret",
+    }).status_code == 400
+
+
+def test_register_allows_patient_and_doctor(client):
+    for role in ("patient", "doctor"):
+        response = client.post("/register", json={
+            "name": role,
+            "email": f"new-{role}@example.com",
+            "password": "secret",
+            "role": role,
+        })
+
+        assert response.status_code == 200
+
+
+def test_admin_routes_refuse_other_roles(client, make_user):
+    _, headers = make_user("doctor")
+
+    assert client.get("/admin/export/chat_history", headers=headers).status_code == 403
+    assert client.get("/admin/analytics/trends", headers=headers).status_code == 403
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+
+from app import passwords
+from app.bulk_import import import_users
+from app.models import User
+
+
+def test_passwords_module_does_not_import_the_app():
+    # hashing pool processes are spawned and import only app.passwords
+    check = (
+        "import sys, app.passwords; "
+        "assert 'app.main' not in sys.modules and 'app.database' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", check], check=True)
+
+
+def test_import_hashes_in_shared_pool(db, monkeypatch):
+    monkeypatch.setattr(passwords, "HASH_WORKERS", 2)
+    records = [
+        {"name": f"Doctor {n}", "email": f"bulk-{n}@example.com", "password": f"secret-{n}",
+         "role": "doctor", "specialization": "cardiologist"}
+        for n in range(4)
+    ]
+
+    try:
+        report = import_users(db, records[:2])
+        pool = passwords._get_pool()
+        report_2 = import_users(db, records[2:] + [{**records[0], "role": "admin"}])
+        assert passwords._get_pool() is pool
+    finally:
+        passwords.shutdown_pool()
+
+    assert report["created"] == 2
+    assert report_2["created"] == 2
+    assert report_2["errors"][0]["error"] == "Invalid role: admin"
+
+    user = db.query(User).filter(User.email == "bulk-3@example.com").one()
+    assert passwords.verify_password("secret-3", user.password)
+
+
+def test_configure_pool_resizes_the_shared_pool(monkeypatch):
+    monkeypatch.setattr(passwords, "HASH_WORKERS", 2)
+
+    try:
+        passwords._get_pool()
+        passwords.configure_pool(3)
+        assert passwords._get_pool()._max_workers == 3
+    finally:
+        passwords.shutdown_pool()
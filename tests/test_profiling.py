@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+
+from app import profiling
+from app.profiling import RequestProfile, StackSampler
+
+
+def _spin(stop):
+    # a plain flag: Event.is_set() lives in threading.py, which the sampler
+    # treats as an idle frame
+    while not stop:
+        pass
+
+
+def tagged_work(stop):
+    _spin(stop)
+
+
+def other_request_work(stop):
+    _spin(stop)
+
+
+def test_sampler_only_samples_request_threads(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_INTERVAL_MS", 1)
+    stop = []
+    tagged = threading.Thread(target=tagged_work, args=(stop,))
+    other = threading.Thread(target=other_request_work, args=(stop,))
+    tagged.start()
+    other.start()
+
+    profile = RequestProfile("GET", "/")
+    profile.threads.add(tagged.ident)
+    sampler = StackSampler(profile)
+
+    try:
+        sampler.start()
+        time.sleep(0.2)
+    finally:
+        sampler.stop()
+        stop.append(True)
+        tagged.join()
+        other.join()
+
+    stacks = " ".join(profile.stacks)
+    assert "tagged_work" in stacks
+    assert "other_request_work" not in stacks
+
+
+def test_save_prunes_oldest_profiles(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_MAX_FILES", 2)
+
+    profiles = [RequestProfile("GET", "/") for _ in range(3)]
+    for n, profile in enumerate(profiles):
+        profiling._save(profile)
+        os.utime(tmp_path / f"{profile.id}.json", (n, n))
+
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{p.id}.json" for p in profiles[1:])
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def dependency_work():
+    _busy(0.1)
+
+
+def endpoint_work():
+    _busy(0.1)
+
+
+def unprofiled_work():
+    _busy(0.3)
+
+
+def test_profile_covers_request_threadpool_work_only(tmp_path, monkeypatch, make_user):
+    import anyio.to_thread
+    from fastapi import Depends, FastAPI
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_INTERVAL_MS", 1)
+    monkeypatch.setattr(anyio.to_thread, "run_sync", profiling._run_sync_profiled)
+
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+    @app.get("/profiled")
+    def profiled(_=Depends(dependency_work)):
+        endpoint_work()
+
+    @app.get("/other")
+    def other():
+        unprofiled_work()
+
+    _, admin = make_user("admin")
+    client = TestClient(app)
+    other_request = threading.Thread(target=client.get, args=("/other",))
+    other_request.start()
+    response = client.get("/profiled", headers={**admin, "X-Profile": "1"})
+    other_request.join()
+
+    stacks = " ".join(profiling.load_profile(response.headers["x-profile-id"])["stacks"])
+    assert "dependency_work" in stacks
+    assert "endpoint_work" in stacks
+    assert "unprofiled_work" not in stacks
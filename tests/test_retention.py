@@ -0,0 +1,112 @@
+import csv
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import retention
+from app.analytics import backfill
+from app.models import ChatHistory, SymptomTrend
+from app.retention import compact_chat_history, get_chat_history
+
+
+def _chat(client, headers, message):
+    response = client.post("/ai/chat", json={"message": message}, headers=headers)
+    assert response.status_code == 200
+
+
+def _age_chats(db, patient_id, days):
+    db.query(ChatHistory).filter(ChatHistory.patient_id == patient_id).update(
+        {ChatHistory.created_at: datetime.utcnow() - timedelta(days=days)}
+    )
+    db.commit()
+
+
+def _trends(db):
+    return {(t.day, t.specialization, t.keyword): t.count for t in db.query(SymptomTrend)}
+
+
+@pytest.fixture
+def archived_patient(client, db, make_user):
+    patient, headers = make_user("patient")
+
+    _chat(client, headers, "old fever zyzzyvaold")
+    _chat(client, headers, "old headache again")
+    _age_chats(db, patient.id, 200)
+    _chat(client, headers, "new cough zyzzyvanew")
+
+    return patient
+
+
+def test_backfill_counts_archived_chats(db, archived_patient):
+    backfill(db)
+    before = _trends(db)
+
+    assert compact_chat_history(db, older_than_days=90) >= 2
+    backfill(db, chunk_size=1)
+
+    assert _trends(db) == before
+
+
+def test_archived_chats_are_not_searchable(client, db, make_user, archived_patient):
+    _, doctor = make_user("doctor", "general physician")
+    compact_chat_history(db, older_than_days=90)
+
+    def search(q):
+        return client.get(
+            "/doctor/search", params={"q": q, "patient_id": archived_patient.id}, headers=doctor
+        ).json()["results"]
+
+    assert search("zyzzyvanew")
+    assert search("zyzzyvaold") == []
+
+
+def test_export_includes_archived_chats(client, db, make_user, archived_patient):
+    _, admin = make_user("admin")
+    compact_chat_history(db, older_than_days=90)
+
+    response = client.get("/admin/export/chat_history", headers=admin)
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    messages = [row["message"] for row in rows if row["patient_id"] == str(archived_patient.id)]
+
+    assert messages == ["old fever zyzzyvaold", "old headache again", "new cough zyzzyvanew"]
+    assert len({row["id"] for row in rows}) == len(rows)
+
+    old_day = (datetime.utcnow() - timedelta(days=200)).date()
+    response = client.get(
+        "/admin/export/chat_history",
+        params={"start": old_day.isoformat(), "end": old_day.isoformat()},
+        headers=admin,
+    )
+    messages = [row["message"] for row in csv.DictReader(io.StringIO(response.text))]
+    assert "old fever zyzzyvaold" in messages
+    assert "new cough zyzzyvanew" not in messages
+
+
+def test_paginates_across_raw_and_archived_tiers(client, db, make_user, monkeypatch):
+    patient, headers = make_user("patient")
+
+    for n in range(5):
+        _chat(client, headers, f"message {n}")
+    _age_chats(db, patient.id, 200)
+    compact_chat_history(db, older_than_days=90, batch_size=2)
+    for n in range(5, 8):
+        _chat(client, headers, f"message {n}")
+
+    decompressed = []
+    decompress = retention.decompress_entries
+    monkeypatch.setattr(
+        retention, "decompress_entries",
+        lambda codec, payload: decompressed.append(1) or decompress(codec, payload),
+    )
+
+    newest = get_chat_history(db, patient.id, limit=2)
+    assert [e["message"] for e in newest] == ["message 6", "message 7"]
+    assert decompressed == []
+
+    pages = [get_chat_history(db, patient.id, limit=3, offset=offset) for offset in (0, 3, 6)]
+    messages = [e["message"] for page in reversed(pages) for e in page]
+
+    assert messages == [f"message {n}" for n in range(8)]
+    assert [e["message"] for e in get_chat_history(db, patient.id)] == messages
+    assert get_chat_history(db, patient.id, limit=3, offset=8) == []
@@ -0,0 +1,78 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import SchedulerLease
+from app.scheduler import Job, LeaseLost, Scheduler, acquire_lease, renew_lease
+
+
+def _job(name, func):
+    return Job(name, func, interval=60)
+
+
+def test_metrics_are_shared_across_workers(db):
+    job = _job("test_shared_metrics", lambda db, renew: 3)
+    first, second = Scheduler([job]), Scheduler([job])
+
+    first.run_job(job)
+    second.run_job(job)  # lease held by the first worker: skipped
+
+    for worker in (first, second):
+        metrics = worker.metrics(db)["jobs"]["test_shared_metrics"]
+        assert metrics["owner"] == first.owner
+        assert metrics["runs"] == 1
+        assert metrics["last_rows_affected"] == 3
+        assert metrics["last_duration_ms"] is not None
+
+
+def test_failures_are_recorded(db):
+    def fail(db, renew):
+        raise RuntimeError("boom")
+
+    job = _job("test_failing_job", fail)
+    worker = Scheduler([job])
+    worker.run_job(job)
+
+    metrics = worker.metrics(db)["jobs"]["test_failing_job"]
+    assert metrics["errors"] == 1
+    assert metrics["last_error"] == "boom"
+
+
+def test_renew_extends_the_lease_and_detects_takeover(db):
+    ttl = timedelta(seconds=60)
+    assert acquire_lease(db, "test_renew", "worker-a", ttl)
+
+    lease = db.get(SchedulerLease, "test_renew")
+    lease.expires_at = datetime.utcnow() + timedelta(seconds=1)
+    db.commit()
+
+    renew_lease(db, "test_renew", "worker-a", ttl)
+    db.refresh(lease)
+    assert lease.expires_at > datetime.utcnow() + timedelta(seconds=50)
+    assert not acquire_lease(db, "test_renew", "worker-b", ttl)
+
+    lease.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert acquire_lease(db, "test_renew", "worker-b", ttl)
+
+    with pytest.raises(LeaseLost):
+        renew_lease(db, "test_renew", "worker-a", ttl)
+
+
+def test_forked_workers_do_not_share_a_lease():
+    calls = []
+    job = _job("test_forked_workers", lambda db, renew: calls.append(1) or 0)
+    master = Scheduler([job])
+    worker = Scheduler([job])
+    # preload_app: every worker inherits the scheduler built in the master
+    worker.owner = master.owner
+
+    for scheduler in (master, worker):
+        scheduler.start()
+    time.sleep(0.5)
+    for scheduler in (master, worker):
+        scheduler.stop()
+
+    assert master.owner != worker.owner
+    assert calls == [1]